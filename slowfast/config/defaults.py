@@ -75,6 +75,22 @@ _C.TRAIN.CHECKPOINT_EPOCH_RESET = False
 # If set, clear all layer names according to the pattern provided.
 _C.TRAIN.CHECKPOINT_CLEAR_NAME_PATTERN = ()  # ("backbone.",)
 
+# If True, keep the conv weights and the inputs in the channels last memory
+# format, which is faster on Tensor Cores under mixed precision.
+_C.TRAIN.CHANNELS_LAST = False
+
+# If True, let cuDNN benchmark the conv algorithms for the (fixed) input
+# shapes and allow TF32 in matmuls and convolutions on Ampere and newer GPUs.
+_C.TRAIN.CUDNN_BENCHMARK = False
+
+# If True, compile the model with torch.compile (PyTorch >= 2.0) for training
+# and validation. Not used with multigrid long cycles.
+_C.TRAIN.COMPILE = False
+
+# torch.compile mode, options include `default`, `reduce-overhead` and
+# `max-autotune`.
+_C.TRAIN.COMPILE_MODE = "max-autotune"
+
 # ---------------------------------------------------------------------------- #
 # Testing options
 # ---------------------------------------------------------------------------- #
@@ -428,6 +444,10 @@ _C.SOLVER.BASE_LR_SCALE_NUM_SHARDS = False
 # Use Mixed Precision Training
 _C.SOLVER.USE_MIXED_PRECISION = False
 
+# Autocast dtype for Mixed Precision Training, options include `fp16` and
+# `bf16`. bf16 has the fp32 exponent range and does not use loss scaling.
+_C.SOLVER.AMP_DTYPE = "fp16"
+
 # If > 0.0, use label smoothing
 _C.SOLVER.SMOOTHING = 0.0
 
@@ -454,7 +474,8 @@ _C.OUTPUT_DIR = "./tmp"
 # operator implementations in GPU operator libraries.
 _C.RNG_SEED = 1
 
-# Log period in iters.
+# Log period in iters. The train top-1/top-5 errors are only computed on
+# the logged iterations and the last iteration of each epoch.
 _C.LOG_PERIOD = 10
 
 # If True, log the model info.
@@ -498,6 +519,12 @@ _C.DATA_LOADER.PIN_MEMORY = True
 # Enable multi thread decoding.
 _C.DATA_LOADER.ENABLE_MULTI_THREAD_DECODE = False
 
+# Keep the data loader workers alive across epochs.
+_C.DATA_LOADER.PERSISTENT_WORKERS = True
+
+# Number of batches loaded in advance by each worker.
+_C.DATA_LOADER.PREFETCH_FACTOR = 4
+
 
 # ---------------------------------------------------------------------------- #
 # Detection options.
@@ -10,12 +10,15 @@ from torch.utils.data._utils.collate import default_collate
 from torch.utils.data.distributed import DistributedSampler
 from torch.utils.data.sampler import RandomSampler
 
+import slowfast.utils.logging as logging
 from slowfast.datasets.multigrid_helper import ShortCycleBatchSampler
 
 from . import utils as utils
 from .build import build_dataset
 from .samplers import RASampler
 
+logger = logging.get_logger(__name__)
+
 
 def detection_collate(batch):
     """
@@ -62,6 +65,8 @@ def construct_loader(cfg, split, is_precise_bn=False):
             slowfast/config/defaults.py
         split (str): the split of the data loader. Options include `train`,
             `val`, and `test`.
+        is_precise_bn (bool): whether the loader is only used for computing
+            precise BN stats. Its workers are not kept alive across epochs.
     """
     assert split in ["train", "val", "test"]
     if split in ["train"]:
@@ -80,9 +85,25 @@ def construct_loader(cfg, split, is_precise_bn=False):
         shuffle = False
         drop_last = False
 
+    if cfg.NUM_GPUS > 0 and not cfg.DATA_LOADER.PIN_MEMORY:
+        logger.warning(
+            "The {} loader does not pin memory, host to device copies will "
+            "not overlap with compute. Set DATA_LOADER.PIN_MEMORY.".format(split)
+        )
+
     # Construct the dataset
     dataset = build_dataset(dataset_name, cfg, split)
 
+    # Options that are only valid with worker processes.
+    worker_kwargs = {}
+    if cfg.DATA_LOADER.NUM_WORKERS > 0:
+        worker_kwargs = {
+            "persistent_workers": (
+                cfg.DATA_LOADER.PERSISTENT_WORKERS and not is_precise_bn
+            ),
+            "prefetch_factor": cfg.DATA_LOADER.PREFETCH_FACTOR,
+        }
+
     if isinstance(dataset, torch.utils.data.IterableDataset):
         loader = torch.utils.data.DataLoader(
             dataset,
@@ -92,6 +113,7 @@ def construct_loader(cfg, split, is_precise_bn=False):
             drop_last=drop_last,
             collate_fn=detection_collate if cfg.DETECTION.ENABLE else None,
             worker_init_fn=utils.loader_worker_init_fn(dataset),
+            **worker_kwargs,
         )
     else:
         if (
@@ -111,6 +133,7 @@ def construct_loader(cfg, split, is_precise_bn=False):
                 num_workers=cfg.DATA_LOADER.NUM_WORKERS,
                 pin_memory=cfg.DATA_LOADER.PIN_MEMORY,
                 worker_init_fn=utils.loader_worker_init_fn(dataset),
+                **worker_kwargs,
             )
         else:
             # Create a sampler for multi-process training
@@ -126,6 +149,7 @@ def construct_loader(cfg, split, is_precise_bn=False):
                 drop_last=drop_last,
                 collate_fn=detection_collate if cfg.DETECTION.ENABLE else None,
                 worker_init_fn=utils.loader_worker_init_fn(dataset),
+                **worker_kwargs,
             )
     return loader
 
@@ -160,3 +184,82 @@ def shuffle_dataset(loader, cur_epoch):
     if isinstance(sampler, DistributedSampler) or isinstance(sampler, RASampler):
         # DistributedSampler shuffles data based on epoch
         sampler.set_epoch(cur_epoch)
+
+
+def to_cuda(data):
+    """
+    Transfer the tensors of a batch to the current GPU device.
+    Args:
+        data (tensor, list, tuple or dict): (nested) batch data. Non-tensor
+            entries such as strings are returned as is.
+    """
+    if isinstance(data, torch.Tensor):
+        return data.cuda(non_blocking=True)
+    if isinstance(data, list):
+        return [to_cuda(val) for val in data]
+    if isinstance(data, tuple):
+        return tuple(to_cuda(val) for val in data)
+    if isinstance(data, dict):
+        return {key: to_cuda(val) for key, val in data.items()}
+    return data
+
+
+def _record_stream(data, stream):
+    """
+    Mark the tensors of a batch as in use by the given CUDA stream.
+    Args:
+        data (tensor, list, tuple or dict): (nested) batch data.
+        stream (torch.cuda.Stream): stream that consumes the batch.
+    """
+    if isinstance(data, torch.Tensor):
+        data.record_stream(stream)
+    elif isinstance(data, (list, tuple)):
+        for val in data:
+            _record_stream(val, stream)
+    elif isinstance(data, dict):
+        for val in data.values():
+            _record_stream(val, stream)
+
+
+class DataPrefetcher(object):
+    """
+    Wrap a data loader to transfer its batches to the current GPU device on a
+    dedicated CUDA stream. The copy of the next batch is issued before the
+    current one is returned, so that it overlaps with the computation on the
+    current batch. The loader should use pinned memory
+    (`DATA_LOADER.PIN_MEMORY`) for the copies to be asynchronous.
+    """
+
+    def __init__(self, loader):
+        """
+        Args:
+            loader (DataLoader or iterable): data loader, or an iterator over
+                it, to prefetch the batches from.
+        """
+        self.loader = loader
+
+    def __len__(self):
+        return len(self.loader)
+
+    def __iter__(self):
+        stream = torch.cuda.Stream()
+        loader_iter = iter(self.loader)
+        next_batch = self._preload(loader_iter, stream)
+        while next_batch is not None:
+            cur_stream = torch.cuda.current_stream()
+            cur_stream.wait_stream(stream)
+            batch = next_batch
+            # The batch was allocated on the side stream; keep its memory
+            # from being reused before the current stream is done with it.
+            _record_stream(batch, cur_stream)
+            next_batch = self._preload(loader_iter, stream)
+            yield batch
+
+    @staticmethod
+    def _preload(loader_iter, stream):
+        try:
+            batch = next(loader_iter)
+        except StopIteration:
+            return None
+        with torch.cuda.stream(stream):
+            return to_cuda(batch)
@@ -57,6 +57,14 @@ def build_model(cfg, gpu_id=None):
                 model.patch_embed_3d.proj.weight.data[:, :, n, :, :] = model.patch_embed.proj.weight.data
                 model.patch_embed_3d.proj.bias.data = model.patch_embed.proj.bias.data
 
+    if cfg.TRAIN.CHANNELS_LAST:
+        # 4-D and 5-D conv weights each have their own channels last format.
+        for module in model.modules():
+            if isinstance(module, torch.nn.Conv2d):
+                module.to(memory_format=torch.channels_last)
+            elif isinstance(module, torch.nn.Conv3d):
+                module.to(memory_format=torch.channels_last_3d)
+
     if cfg.NUM_GPUS:
         if gpu_id is None:
             # Determine the GPU used by the current process
@@ -447,9 +447,80 @@ class ScalarMeter(object):
         return self.total / self.count
 
 
+class AsyncScalarReader(object):
+    """
+    Double-buffered readback of a small tensor of scalar stats from GPU to CPU.
+    Each `push` starts a non-blocking copy of the stats into a pinned host
+    buffer and returns the stats pushed at the previous call, so the host only
+    waits on a copy that was queued one iteration earlier instead of issuing a
+    blocking `.item()` per scalar.
+    """
+
+    def __init__(self, use_gpu=True):
+        """
+        Args:
+            use_gpu (bool): whether the stats live on the GPU. If False, the
+                copies are plain synchronous host copies.
+        """
+        self._use_gpu = use_gpu
+        self._bufs = None
+        self._cur = 0
+        self._pending = None
+
+    def push(self, stats, *extra):
+        """
+        Start copying the stats to the host.
+        Args:
+            stats (tensor): 1-D tensor of scalar stats. The number of stats
+                may change between calls.
+            extra: values returned alongside the stats once they are read.
+        Returns:
+            (tuple or None): `(stats, extra)` of the previous push, where
+                `stats` is a list of floats, or None if nothing was pending.
+        """
+        stats = stats.detach()
+        # The buffers only grow, so that pushing a varying number of stats
+        # does not reallocate pinned memory every iteration.
+        if self._bufs is None or self._bufs[0].numel() < stats.numel():
+            self._bufs = [
+                torch.empty(
+                    stats.numel(), dtype=torch.float32, pin_memory=self._use_gpu
+                )
+                for _ in range(2)
+            ]
+        buf = self._bufs[self._cur][: stats.numel()]
+        self._cur = 1 - self._cur
+        buf.copy_(stats, non_blocking=self._use_gpu)
+        event = None
+        if self._use_gpu:
+            event = torch.cuda.Event()
+            event.record()
+
+        prev = self.pop()
+        self._pending = (buf, event, extra)
+        return prev
+
+    def pop(self):
+        """
+        Wait for the pending copy and return it.
+        Returns:
+            (tuple or None): `(stats, extra)` of the last push, or None if
+                nothing is pending.
+        """
+        if self._pending is None:
+            return None
+        buf, event, extra = self._pending
+        self._pending = None
+        if event is not None:
+            event.synchronize()
+        return buf.tolist(), extra
+
+
 class TrainMeter(object):
     """
-    Measure training stats.
+    Measure training stats. The top-1/top-5 errors are only computed on the
+    logged iterations (every `LOG_PERIOD` iterations) and on the last one, so
+    the epoch errors are averaged over those minibatches.
     """
 
     def __init__(self, epoch_iters, cfg):
@@ -467,13 +538,16 @@ class TrainMeter(object):
         self.loss = ScalarMeter(cfg.LOG_PERIOD)
         self.loss_total = 0.0
         self.lr = None
-        # Current minibatch errors (smoothed over a window).
-        self.mb_top1_err = ScalarMeter(cfg.LOG_PERIOD)
-        self.mb_top5_err = ScalarMeter(cfg.LOG_PERIOD)
+        # Current minibatch errors. They are only sampled once per logged
+        # iteration, so they are not smoothed over a window.
+        self.mb_top1_err = ScalarMeter(1)
+        self.mb_top5_err = ScalarMeter(1)
         # Number of misclassified examples.
         self.num_top1_mis = 0
         self.num_top5_mis = 0
         self.num_samples = 0
+        # Number of examples the errors were computed on.
+        self.num_err_samples = 0
         self.output_dir = cfg.OUTPUT_DIR
 
     def reset(self):
@@ -488,6 +562,7 @@ class TrainMeter(object):
         self.num_top1_mis = 0
         self.num_top5_mis = 0
         self.num_samples = 0
+        self.num_err_samples = 0
 
     def iter_tic(self):
         """
@@ -511,8 +586,10 @@ class TrainMeter(object):
         """
         Update the current stats.
         Args:
-            top1_err (float): top1 error rate.
-            top5_err (float): top5 error rate.
+            top1_err (float or None): top1 error rate, None if it was not
+                computed for this minibatch.
+            top5_err (float or None): top5 error rate, None if it was not
+                computed for this minibatch.
             loss (float): loss value.
             lr (float): learning rate.
             mb_size (int): mini batch size.
@@ -522,13 +599,14 @@ class TrainMeter(object):
         self.loss_total += loss * mb_size
         self.num_samples += mb_size
 
-        if not self._cfg.DATA.MULTI_LABEL:
+        if not self._cfg.DATA.MULTI_LABEL and top1_err is not None:
             # Current minibatch stats
             self.mb_top1_err.add_value(top1_err)
             self.mb_top5_err.add_value(top5_err)
             # Aggregate stats
             self.num_top1_mis += top1_err * mb_size
             self.num_top5_mis += top5_err * mb_size
+            self.num_err_samples += mb_size
 
     def log_iter_stats(self, cur_epoch, cur_iter):
         """
@@ -582,11 +660,12 @@ class TrainMeter(object):
             "RAM": "{:.2f}/{:.2f}G".format(*misc.cpu_mem_usage()),
         }
         if not self._cfg.DATA.MULTI_LABEL:
-            top1_err = self.num_top1_mis / self.num_samples
-            top5_err = self.num_top5_mis / self.num_samples
+            if self.num_err_samples > 0:
+                top1_err = self.num_top1_mis / self.num_err_samples
+                top5_err = self.num_top5_mis / self.num_err_samples
+                stats["top1_err"] = top1_err
+                stats["top5_err"] = top5_err
             avg_loss = self.loss_total / self.num_samples
-            stats["top1_err"] = top1_err
-            stats["top5_err"] = top5_err
             stats["loss"] = avg_loss
         logging.log_json_stats(stats)
 
@@ -674,8 +753,9 @@ class ValMeter(object):
             labels (tensor): labels.
         """
         # TODO: merge update_prediction with update_stats.
-        self.all_preds.append(preds)
-        self.all_labels.append(labels)
+        # Keep them on the device; they are concatenated once per epoch.
+        self.all_preds.append(preds.detach())
+        self.all_labels.append(labels.detach())
 
     def log_iter_stats(self, cur_epoch, cur_iter):
         """
@@ -988,6 +1068,8 @@ class EPICValMeter(object):
         self.num_noun_top1_cor = 0
         self.num_noun_top5_cor = 0
         self.num_samples = 0
+        self.all_preds = []
+        self.all_labels = []
 
     def reset(self):
         """
@@ -1007,6 +1089,8 @@ class EPICValMeter(object):
         self.num_noun_top1_cor = 0
         self.num_noun_top5_cor = 0
         self.num_samples = 0
+        self.all_preds = []
+        self.all_labels = []
 
     def iter_tic(self):
         """
@@ -1047,8 +1131,6 @@ class EPICValMeter(object):
         self.num_top1_cor += top1_acc[2] * mb_size
         self.num_top5_cor += top5_acc[2] * mb_size
         self.num_samples += mb_size
-        self.all_preds = []
-        self.all_labels = []
 
     def log_iter_stats(self, cur_epoch, cur_iter):
         """
@@ -1128,8 +1210,9 @@ class EPICValMeter(object):
             labels (tensor): labels.
         """
         # TODO: merge update_prediction with update_stats.
-        self.all_preds.append(preds[0])
-        self.all_labels.append(labels['verb'])
+        # Keep them on the device; they are concatenated once per epoch.
+        self.all_preds.append(preds[0].detach())
+        self.all_labels.append(labels['verb'].detach())
 
 
 class EPICTestMeter(object):
@@ -53,6 +53,20 @@ def topk_errors(preds, labels, ks):
     return [(1.0 - x / preds.size(0)) * 100.0 for x in num_topks_correct]
 
 
+def topk_errors_tensor(preds, labels, ks):
+    """
+    Computes the top-k errors of all the ks as a single tensor.
+    Args:
+        preds (array): array of predictions. Dimension is N.
+        labels (array): array of labels. Dimension is N.
+        ks (list): list of ks to calculate the top errors.
+    Returns:
+        (tensor): the `i`-th entry is the top-`ks[i]` error.
+    """
+    num_topks_correct = torch.stack(topks_correct(preds, labels, ks))
+    return (1.0 - num_topks_correct / preds.size(0)) * 100.0
+
+
 def topk_accuracies(preds, labels, ks):
     """
     Computes the top-k accuracy for each k.
@@ -65,6 +79,20 @@ def topk_accuracies(preds, labels, ks):
     return [(x / preds.size(0)) * 100.0 for x in num_topks_correct]
 
 
+def topk_accuracies_tensor(preds, labels, ks):
+    """
+    Computes the top-k accuracies of all the ks as a single tensor.
+    Args:
+        preds (array): array of predictions. Dimension is N.
+        labels (array): array of labels. Dimension is N.
+        ks (list): list of ks to calculate the top accuracies.
+    Returns:
+        (tensor): the `i`-th entry is the top-`ks[i]` accuracy.
+    """
+    num_topks_correct = torch.stack(topks_correct(preds, labels, ks))
+    return (num_topks_correct / preds.size(0)) * 100.0
+
+
 def multitask_topks_correct(preds, labels, ks=(1,)):
     """
     Args:
@@ -80,8 +108,9 @@ def multitask_topks_correct(preds, labels, ks=(1,)):
     max_k = int(np.max(ks))
     task_count = len(preds)
     batch_size = labels[0].size(0)
-    all_correct = torch.zeros(max_k, batch_size).type(torch.ByteTensor)
-    all_correct = all_correct.to(preds[0].device)
+    all_correct = torch.zeros(
+        max_k, batch_size, dtype=torch.uint8, device=preds[0].device
+    )
     for output, label in zip(preds, labels):
         _, max_k_idx = output.topk(max_k, dim=1, largest=True, sorted=True)
         # Flip batch_size, class_count as .view doesn't work on non-contiguous
@@ -105,4 +134,20 @@ def multitask_topk_accuracies(preds, labels, ks):
         ks (list): list of ks to calculate the top accuracies.
    """
     num_multitask_topks_correct = multitask_topks_correct(preds, labels, ks)
-    return [(x / preds[0].size(0)) * 100.0 for x in num_multitask_topks_correct]
\ No newline at end of file
+    return [(x / preds[0].size(0)) * 100.0 for x in num_multitask_topks_correct]
+
+
+def multitask_topk_accuracies_tensor(preds, labels, ks):
+    """
+    Computes the multitask top-k accuracies of all the ks as a single tensor.
+    Args:
+        preds (array): array of predictions. Dimension is N.
+        labels (array): array of labels. Dimension is N.
+        ks (list): list of ks to calculate the top accuracies.
+    Returns:
+        (tensor): the `i`-th entry is the top-`ks[i]` accuracy.
+    """
+    num_multitask_topks_correct = torch.stack(
+        multitask_topks_correct(preds, labels, ks)
+    )
+    return (num_multitask_topks_correct / preds[0].size(0)) * 100.0
@@ -75,6 +75,39 @@ def cpu_mem_usage():
     return usage, total
 
 
+def to_channels_last(tensor):
+    """
+    Convert a tensor to the channels last memory format matching its rank.
+    Args:
+        tensor (tensor): NxCxHxW or NxCxTxHxW tensor. Tensors of other ranks
+            are returned as is.
+    """
+    if tensor.dim() == 4:
+        return tensor.contiguous(memory_format=torch.channels_last)
+    if tensor.dim() == 5:
+        return tensor.contiguous(memory_format=torch.channels_last_3d)
+    return tensor
+
+
+def get_autocast_kwargs(cfg):
+    """
+    Get the arguments of `torch.cuda.amp.autocast` for mixed precision. fp16
+    is the default autocast dtype and is not passed, so that it also works on
+    PyTorch versions whose autocast has no `dtype` argument.
+    Args:
+        cfg (CfgNode): configs. Details can be found in
+            slowfast/config/defaults.py
+    """
+    kwargs = {"enabled": cfg.SOLVER.USE_MIXED_PRECISION}
+    if cfg.SOLVER.AMP_DTYPE == "bf16":
+        kwargs["dtype"] = torch.bfloat16
+    elif cfg.SOLVER.AMP_DTYPE != "fp16":
+        raise NotImplementedError(
+            "Does not support {} AMP dtype".format(cfg.SOLVER.AMP_DTYPE)
+        )
+    return kwargs
+
+
 def _get_model_analysis_input(cfg, use_train_input):
     """
     Return a dummy input for model analysis with batch size 1. The input is
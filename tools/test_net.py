@@ -49,28 +49,12 @@ def perform_test(test_loader, model, test_meter, cfg, writer=None):
     for cur_iter, (inputs, labels, video_idx, meta) in enumerate(test_loader):
         if cfg.NUM_GPUS:
             # Transfer the data to the current GPU device.
-            if isinstance(inputs, (list,)):
-                for i in range(len(inputs)):
-                    inputs[i] = inputs[i].cuda(non_blocking=True)
-            else:
-                inputs = inputs.cuda(non_blocking=True)
-
-            # Transfer the data to the current GPU device.
-            if isinstance(labels, (dict,)):
-                labels = {k: v.cuda() for k, v in labels.items()}
-            else:
-                labels = labels.cuda()
-            video_idx = video_idx.cuda()
-            for key, val in meta.items():
-                if isinstance(val, (list,)):
-                    for i in range(len(val)):
-                        if not isinstance(val[i], (str,)):
-                            val[i] = val[i].cuda(non_blocking=True)
-                else:
-                    meta[key] = val.cuda(non_blocking=True)
+            inputs, labels, video_idx, meta = loader.to_cuda(
+                (inputs, labels, video_idx, meta)
+            )
         test_meter.data_toc()
 
-        with torch.cuda.amp.autocast(enabled=cfg.SOLVER.USE_MIXED_PRECISION):
+        with torch.cuda.amp.autocast(**misc.get_autocast_kwargs(cfg)):
             # Perform the forward pass.
             shuffle_frames = cfg.TEST.SHUFFLE_FRAMES
             if shuffle_frames:
@@ -78,6 +62,9 @@ def perform_test(test_loader, model, test_meter, cfg, writer=None):
                 B, C, T, H, W = inputs[0].shape
                 shuffled_indices = np.random.permutation(T)
                 inputs = [inputs[0][:, :, shuffled_indices, :, :]]
+            if cfg.TRAIN.CHANNELS_LAST:
+                # Match the memory format of the conv weights.
+                inputs = [misc.to_channels_last(x) for x in inputs]
             preds = model(inputs)
 
             # Gather all the predictions across all the devices to perform ensemble.
@@ -184,6 +171,11 @@ def test(cfg):
     logger.info("Test with config:")
     logger.info(cfg)
 
+    if cfg.SOLVER.USE_MIXED_PRECISION and cfg.SOLVER.AMP_DTYPE == "bf16":
+        assert hasattr(
+            torch, "autocast"
+        ), "SOLVER.AMP_DTYPE bf16 needs PyTorch 1.10"
+
     # Build the video model and print model statistics.
     model = build_model(cfg)
     if du.is_master_proc() and cfg.LOG_MODEL_INFO:
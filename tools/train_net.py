@@ -3,6 +3,8 @@
 
 """Train a video classification model."""
 
+import contextlib
+import itertools
 import numpy as np
 import pickle
 import pprint
@@ -20,8 +22,15 @@ import slowfast.utils.metrics as metrics
 import slowfast.utils.misc as misc
 import slowfast.visualization.tensorboard_vis as tb
 from slowfast.datasets import loader
+from slowfast.datasets.loader import DataPrefetcher
 from slowfast.models import build_model
-from slowfast.utils.meters import TrainMeter, ValMeter, EPICTrainMeter, EPICValMeter
+from slowfast.utils.meters import (
+    AsyncScalarReader,
+    TrainMeter,
+    ValMeter,
+    EPICTrainMeter,
+    EPICValMeter,
+)
 from slowfast.utils.multigrid import MultigridSchedule
 # from timm.utils import NativeScaler
 
@@ -45,6 +54,10 @@ def train_epoch(
             slowfast/config/defaults.py
         writer (TensorboardWriter, optional): TensorboardWriter object
             to writer Tensorboard log.
+        loss_scaler (GradScaler, optional): scaler for fp16 mixed precision
+            training, None to not scale the loss.
+        loss_fun (callable): loss function.
+        mixup_fn (Mixup, optional): mixup/cutmix transform of the batch.
     """
     # Enable train mode.
     model.train()
@@ -53,167 +66,126 @@ def train_epoch(
     data_size = len(train_loader)
 
     cur_global_batch_size = cfg.NUM_SHARDS * cfg.TRAIN.BATCH_SIZE
-    num_iters = cfg.GLOBAL_BATCH_SIZE // cur_global_batch_size
+    num_iters = max(cfg.GLOBAL_BATCH_SIZE // cur_global_batch_size, 1)
     
     if cur_global_batch_size < cfg.GLOBAL_BATCH_SIZE:
         logger.info("Gradient accumulation enabled!")
         logger.info(f"cur_global_batch_size: {cur_global_batch_size}, target_global_batch_size: {cfg.GLOBAL_BATCH_SIZE}")
 
-    for cur_iter, (inputs, labels, index, meta) in enumerate(train_loader):
-        global_step = data_size * cur_epoch + cur_iter + 1
+    # Scale the loss (rather than the accumulated gradients) so that the
+    # correct lr@GLOBAL_BATCH_SIZE is applied.
+    inv_num_iters = 1.0 / num_iters
 
-        # Transfer the data to the current GPU device.
-        if cfg.NUM_GPUS:
-            if isinstance(inputs, (list,)):
-                for i in range(len(inputs)):
-                    inputs[i] = inputs[i].cuda(non_blocking=True)
-            else:
-                inputs = inputs.cuda(non_blocking=True)
-            for key, val in meta.items():
-                if isinstance(val, (list,)):
-                    for i in range(len(val)):
-                        if not isinstance(val[i], (str,)):
-                            val[i] = val[i].cuda(non_blocking=True)
-                else:
-                    meta[key] = val.cuda(non_blocking=True)
+    # Read the configs used in the loop once.
+    autocast_kwargs = misc.get_autocast_kwargs(cfg)
+    channels_last = cfg.TRAIN.CHANNELS_LAST
+    log_period = cfg.LOG_PERIOD
+    num_gpus = cfg.NUM_GPUS
+    num_mb_replicas = max(num_gpus, 1)
+
+    def _forward(inputs, labels):
+        with torch.cuda.amp.autocast(**autocast_kwargs):
+            preds = model(inputs)
+            loss = loss_fun(preds, labels)
+        return preds, loss
+
+    def _update_stats(record):
+        if record is None:
+            return
+        stats, (lr, mb_size, cur_iter) = record
+        loss = stats[0]
+        top1_err, top5_err = stats[1:] if len(stats) == 3 else (None, None)
+
+        # Update and log stats.
+        train_meter.update_stats(top1_err, top5_err, loss, lr, mb_size)
+
+        # write to tensorboard format if available, on the iterations the
+        # errors were computed on: the logged ones and the last one.
+        if writer is not None and top1_err is not None:
+            writer.add_scalars(
+                {
+                    "Train/loss": loss,
+                    "Train/lr": lr,
+                    "Train/Top1_err": top1_err,
+                    "Train/Top5_err": top5_err,
+                },
+                global_step=data_size * cur_epoch + cur_iter,
+            )
+
+        train_meter.log_iter_stats(cur_epoch, cur_iter)
+
+    stats_reader = AsyncScalarReader(use_gpu=num_gpus > 0)
+    last_lr = None
+    optimizer.zero_grad(set_to_none=True)
+
+    # Transfer the data to the current GPU device on a side stream.
+    data_iter = DataPrefetcher(train_loader) if num_gpus else train_loader
+
+    for cur_iter, (inputs, labels, index, meta) in enumerate(data_iter):
+        global_step = data_size * cur_epoch + cur_iter + 1
 
         if mixup_fn is not None:
-            labels = labels.cuda()
             inputs, labels = mixup_fn(inputs[0], labels)
             inputs = [inputs]
-        else:
-            labels = labels.cuda(non_blocking=True)
+        if channels_last:
+            inputs = [misc.to_channels_last(x) for x in inputs]
 
-        # Update the learning rate.
+        # Update the learning rate, only touching the param groups when it
+        # changes (e.g. once per step for `steps_with_relative_lrs`).
         lr = optim.get_epoch_lr(cur_epoch + float(cur_iter) / data_size, cfg)
-        optim.set_lr(optimizer, lr)
+        if lr != last_lr:
+            optim.set_lr(optimizer, lr)
+            last_lr = lr
 
         train_meter.data_toc()
         
-        # Perform the backward pass.
-        if cur_global_batch_size >= cfg.GLOBAL_BATCH_SIZE:
-            with torch.cuda.amp.autocast(enabled=cfg.SOLVER.USE_MIXED_PRECISION):
-                preds = model(inputs)
-                loss = loss_fun(preds, labels)
-
-            if cfg.SOLVER.USE_MIXED_PRECISION:
-                optimizer.zero_grad()
-                loss_scaler.scale(loss).backward()
+        # Perform the forward and backward pass. Gradients are accumulated
+        # locally and only all-reduced on the last step of an accumulation.
+        is_sync_step = (cur_iter + 1) % num_iters == 0
+        if is_sync_step or not hasattr(model, "no_sync"):
+            ddp_ctx = contextlib.nullcontext()
+        else:
+            ddp_ctx = model.no_sync()
+        with ddp_ctx:
+            preds, loss = _forward(inputs, labels)
+            if loss_scaler is not None:
+                loss_scaler.scale(loss * inv_num_iters).backward()
+            else:
+                (loss * inv_num_iters).backward()
+
+        # Update the parameters.
+        if is_sync_step:
+            if loss_scaler is not None:
                 loss_scaler.step(optimizer)
                 loss_scaler.update()
-
             else:
-                optimizer.zero_grad()
-                loss.backward()
                 optimizer.step()
-        
-        else:
-            if cur_iter == 0:
-                optimizer.zero_grad()
-            
-            if (cur_iter + 1) % num_iters != 0:
-                if cur_iter < num_iters:
-                    logger.info(f"{cur_iter + 1}/{data_size}. No Synced forward")
-                with model.no_sync():
-                    with torch.cuda.amp.autocast(enabled=cfg.SOLVER.USE_MIXED_PRECISION):
-                        preds = model(inputs)
-                        loss = loss_fun(preds, labels)
-                    # no synchronization, accumulate grads
-                    if cfg.SOLVER.USE_MIXED_PRECISION:
-                        loss_scaler.scale(loss).backward()
-
-                    else:
-                        loss.backward()
-            
-            if (cur_iter + 1) % num_iters == 0:
-                if cur_iter < num_iters:
-                    logger.info(f"{cur_iter + 1}/{data_size}. Synced forward")
-                with torch.cuda.amp.autocast(enabled=cfg.SOLVER.USE_MIXED_PRECISION):
-                    preds = model(inputs)
-                    loss = loss_fun(preds, labels)
-                # synchronize grads
-                if cfg.SOLVER.USE_MIXED_PRECISION:
-                    loss_scaler.scale(loss).backward()
+            optimizer.zero_grad(set_to_none=True)
 
-                else:
-                    loss.backward()
-
-                # unscale gradients if mixed precision
-                if cfg.SOLVER.USE_MIXED_PRECISION:
-                    loss_scaler.unscale_(optimizer)
-
-                # scale gradients so that correct lr@GLOBAL_BATCH_SIZE is applied.
-                with torch.no_grad():
-                    for name, param in model.named_parameters():
-                        if param.grad is None:
-                            if cur_iter < num_iters:
-                                logger.info(f"Skipping a param {name}")
-                        else:
-                            if cur_iter < num_iters:
-                                logger.info(f"Scaling a param {name} by 1/{num_iters}")
-                            param.grad /= num_iters
-
-                if cfg.SOLVER.USE_MIXED_PRECISION:
-                    loss_scaler.step(optimizer)
-                    loss_scaler.update()
-                else:
-                    optimizer.step()
-                
-                optimizer.zero_grad()
-
-        top1_err, top5_err = None, None
-            
-        num_topks_correct = metrics.topks_correct(preds, labels, (1, 5))
-        top1_err, top5_err = [
-            (1.0 - x / preds.size(0)) * 100.0 for x in num_topks_correct
-        ]
+        # The errors are only computed on the iterations that TrainMeter logs,
+        # and on the last one so that short epochs still have epoch errors.
+        if (cur_iter + 1) % log_period == 0 or cur_iter == data_size - 1:
+            topks_err = metrics.topk_errors_tensor(preds, labels, (1, 5))
+            stats = torch.cat([loss.detach().view(1), topks_err])
+        else:
+            stats = loss.detach().view(1)
 
         # Gather all the predictions across all the devices.
-        if cfg.NUM_GPUS > 1:
-            loss, top1_err, top5_err = du.all_reduce(
-                [loss, top1_err, top5_err]
-            )
+        if num_gpus > 1:
+            [stats] = du.all_reduce([stats])
 
-        # Copy the stats from GPU to CPU (sync point).
-        loss, top1_err, top5_err = (
-            loss.item(),
-            top1_err.item(),
-            top5_err.item(),
+        # Copy the stats from GPU to CPU without a sync point. The stats of
+        # this iteration are consumed at the next one.
+        prev_stats = stats_reader.push(
+            stats, lr, inputs[0].size(0) * num_mb_replicas, cur_iter
         )
 
-        # Update and log stats.
-        train_meter.update_stats(
-            top1_err,
-            top5_err,
-            loss,
-            lr,
-            inputs[0].size(0)
-            * max(
-                cfg.NUM_GPUS, 1
-            ),
-        )
-    
-        # write to tensorboard format if available.
-        if writer is not None:
-            writer.add_scalars(
-                {
-                    "Train/loss": loss,
-                    "Train/lr": lr,
-                },
-                global_step=data_size * cur_epoch + cur_iter,
-            )
-            writer.add_scalars(
-                {
-                    "Train/Top1_err": top1_err if top1_err is not None else 0.0,
-                    "Train/Top5_err": top5_err if top5_err is not None else 0.0,
-                },
-                global_step=data_size * cur_epoch + cur_iter,
-            )
-
         train_meter.iter_toc()  # measure allreduce for this meter
-        train_meter.log_iter_stats(cur_epoch, cur_iter)
+        _update_stats(prev_stats)
         train_meter.iter_tic()
 
+    _update_stats(stats_reader.pop())
+
     # Log epoch stats.
     train_meter.log_epoch_stats(cur_epoch)
     train_meter.reset()
@@ -236,137 +208,121 @@ def eval_epoch(val_loader, model, val_meter, cur_epoch, cfg, writer=None):
     # Evaluation mode enabled. The running stats would not be updated.
     model.eval()
     val_meter.iter_tic()
+    data_size = len(val_loader)
+
+    # Read the configs used in the loop once.
+    autocast_kwargs = misc.get_autocast_kwargs(cfg)
+    channels_last = cfg.TRAIN.CHANNELS_LAST
+    is_epickitchens = cfg.TRAIN.DATASET == "Epickitchens"
+    log_period = cfg.LOG_PERIOD
+    num_gpus = cfg.NUM_GPUS
+
+    def _update_stats(record):
+        if record is None:
+            return
+        stats, (is_multitask, mb_size, cur_iter) = record
+        # Write to tensorboard on the same iterations as train_epoch: the
+        # logged ones and the last one.
+        write_tb = writer is not None and (
+            (cur_iter + 1) % log_period == 0 or cur_iter == data_size - 1
+        )
 
-    for cur_iter, (inputs, labels, _, meta) in enumerate(val_loader):
-        if cfg.NUM_GPUS:
-            # Transferthe data to the current GPU device.
-            if isinstance(inputs, (list,)):
-                for i in range(len(inputs)):
-                    inputs[i] = inputs[i].cuda(non_blocking=True)
-            else:
-                inputs = inputs.cuda(non_blocking=True)
-            if isinstance(labels, (dict,)):
-                labels = {k: v.cuda() for k, v in labels.items()}
-            else:
-                labels = labels.cuda()
-            for key, val in meta.items():
-                if isinstance(val, (list,)):
-                    for i in range(len(val)):
-                        if not isinstance(val[i], (str,)):
-                            val[i] = val[i].cuda(non_blocking=True)
-                else:
-                    meta[key] = val.cuda(non_blocking=True)
-        val_meter.data_toc()
+        if is_multitask:
+            # Verb, noun and action accuracies.
+            (
+                verb_top1_acc, verb_top5_acc,
+                noun_top1_acc, noun_top5_acc,
+                action_top1_acc, action_top5_acc,
+            ) = stats
+            # Update and log stats.
+            val_meter.update_stats(
+                (verb_top1_acc, noun_top1_acc, action_top1_acc),
+                (verb_top5_acc, noun_top5_acc, action_top5_acc),
+                mb_size,
+            )
 
-        with torch.cuda.amp.autocast(enabled=cfg.SOLVER.USE_MIXED_PRECISION):
-            preds = model(inputs)
-            if isinstance(labels, (dict,)) and cfg.TRAIN.DATASET == "Epickitchens":
-                # Compute the verb accuracies.
-                verb_top1_acc, verb_top5_acc = metrics.topk_accuracies(
-                    preds[0], labels['verb'], (1, 5))
+            # write to tensorboard format if available.
+            if write_tb:
+                writer.add_scalars(
+                    {
+                        "Val/verb_top1_acc": verb_top1_acc,
+                        "Val/verb_top5_acc": verb_top5_acc,
+                        "Val/noun_top1_acc": noun_top1_acc,
+                        "Val/noun_top5_acc": noun_top5_acc,
+                        "Val/action_top1_acc": action_top1_acc,
+                        "Val/action_top5_acc": action_top5_acc,
+                    },
+                    global_step=data_size * cur_epoch + cur_iter,
+                )
+        else:
+            top1_err, top5_err = stats
+            # Update and log stats.
+            val_meter.update_stats(top1_err, top5_err, mb_size)
+
+            # write to tensorboard format if available.
+            if write_tb:
+                writer.add_scalars(
+                    {"Val/Top1_err": top1_err, "Val/Top5_err": top5_err},
+                    global_step=data_size * cur_epoch + cur_iter,
+                )
 
-                # Combine the errors across the GPUs.
-                if cfg.NUM_GPUS > 1:
-                    verb_top1_acc, verb_top5_acc = du.all_reduce(
-                        [verb_top1_acc, verb_top5_acc])
+        val_meter.log_iter_stats(cur_epoch, cur_iter)
 
-                # Copy the errors from GPU to CPU (sync point).
-                verb_top1_acc, verb_top5_acc = verb_top1_acc.item(), verb_top5_acc.item()
+    stats_reader = AsyncScalarReader(use_gpu=num_gpus > 0)
 
-                # Compute the noun accuracies.
-                noun_top1_acc, noun_top5_acc = metrics.topk_accuracies(
-                    preds[1], labels['noun'], (1, 5))
+    # Transfer the data to the current GPU device on a side stream.
+    data_iter = DataPrefetcher(val_loader) if num_gpus else val_loader
 
-                # Combine the errors across the GPUs.
-                if cfg.NUM_GPUS > 1:
-                    noun_top1_acc, noun_top5_acc = du.all_reduce(
-                        [noun_top1_acc, noun_top5_acc])
+    for cur_iter, (inputs, labels, _, meta) in enumerate(data_iter):
+        if channels_last:
+            inputs = [misc.to_channels_last(x) for x in inputs]
+        val_meter.data_toc()
 
-                # Copy the errors from GPU to CPU (sync point).
-                noun_top1_acc, noun_top5_acc = noun_top1_acc.item(), noun_top5_acc.item()
+        with torch.cuda.amp.autocast(**autocast_kwargs):
+            preds = model(inputs)
 
-                # Compute the action accuracies.
-                action_top1_acc, action_top5_acc = metrics.multitask_topk_accuracies(
+        is_multitask = isinstance(labels, (dict,)) and is_epickitchens
+        if is_multitask:
+            # Compute the verb, noun and action top-1/top-5 accuracies.
+            stats = torch.cat([
+                metrics.topk_accuracies_tensor(
+                    preds[0], labels['verb'], (1, 5)),
+                metrics.topk_accuracies_tensor(
+                    preds[1], labels['noun'], (1, 5)),
+                metrics.multitask_topk_accuracies_tensor(
                     (preds[0], preds[1]),
                     (labels['verb'], labels['noun']),
-                    (1, 5))
-
-                # Combine the errors across the GPUs.
-                if cfg.NUM_GPUS > 1:
-                    action_top1_acc, action_top5_acc = du.all_reduce([action_top1_acc, action_top5_acc])
-
-                # Copy the errors from GPU to CPU (sync point).
-                action_top1_acc, action_top5_acc = action_top1_acc.item(), action_top5_acc.item()
-
-                val_meter.iter_toc()
-                
-                # Update and log stats.
-                val_meter.update_stats(
-                    (verb_top1_acc, noun_top1_acc, action_top1_acc),
-                    (verb_top5_acc, noun_top5_acc, action_top5_acc),
-                    inputs[0].size(0) * cfg.NUM_GPUS
-                )
-                
-                # write to tensorboard format if available.
-                if writer is not None:
-                    writer.add_scalars(
-                        {
-                            "Val/verb_top1_acc": verb_top1_acc,
-                            "Val/verb_top5_acc": verb_top5_acc,
-                            "Val/noun_top1_acc": noun_top1_acc,
-                            "Val/noun_top5_acc": noun_top5_acc,
-                            "Val/action_top1_acc": action_top1_acc,
-                            "Val/action_top5_acc": action_top5_acc,
-                        },
-                        global_step=len(val_loader) * cur_epoch + cur_iter,
-                    )
-            else:
-                # Compute the errors.
-                num_topks_correct = metrics.topks_correct(preds, labels, (1, 5))
-
-                # Combine the errors across the GPUs.
-                top1_err, top5_err = [
-                    (1.0 - x / preds.size(0)) * 100.0 for x in num_topks_correct
-                ]
-                if cfg.NUM_GPUS > 1:
-                    top1_err, top5_err = du.all_reduce([top1_err, top5_err])
-
-                # Copy the errors from GPU to CPU (sync point).
-                top1_err, top5_err = top1_err.item(), top5_err.item()
-
-                val_meter.iter_toc()
-                # Update and log stats.
-                val_meter.update_stats(
-                    top1_err,
-                    top5_err,
-                    inputs[0].size(0)
-                    * max(
-                        cfg.NUM_GPUS, 1
-                    ),
-                )
-                # write to tensorboard format if available.
-                if writer is not None:
-                    writer.add_scalars(
-                        {"Val/Top1_err": top1_err, "Val/Top5_err": top5_err},
-                        global_step=len(val_loader) * cur_epoch + cur_iter,
-                    )
+                    (1, 5)),
+            ])
+            mb_size = inputs[0].size(0) * num_gpus
+        else:
+            # Compute the errors.
+            stats = metrics.topk_errors_tensor(preds, labels, (1, 5))
+            mb_size = inputs[0].size(0) * max(num_gpus, 1)
 
-            val_meter.update_predictions(preds, labels)
+        # Combine the errors across the GPUs.
+        if num_gpus > 1:
+            [stats] = du.all_reduce([stats])
 
-        val_meter.log_iter_stats(cur_epoch, cur_iter)
+        # Copy the errors from GPU to CPU without a sync point. The stats of
+        # this iteration are consumed at the next one.
+        prev_stats = stats_reader.push(stats, is_multitask, mb_size, cur_iter)
+
+        val_meter.update_predictions(preds, labels)
+
+        val_meter.iter_toc()
+        _update_stats(prev_stats)
         val_meter.iter_tic()
 
+    _update_stats(stats_reader.pop())
+
     # Log epoch stats.
     val_meter.log_epoch_stats(cur_epoch)
     # write to tensorboard format if available.
     if writer is not None:
-        all_preds = [pred.clone().detach() for pred in val_meter.all_preds]
-        all_labels = [
-            label.clone().detach() for label in val_meter.all_labels
-        ]
-        if cfg.NUM_GPUS:
-            all_preds = [pred.cpu() for pred in all_preds]
-            all_labels = [label.cpu() for label in all_labels]
+        # The predictions are kept on the GPU and copied back in one go.
+        all_preds = torch.cat(val_meter.all_preds).cpu()
+        all_labels = torch.cat(val_meter.all_labels).cpu()
         writer.plot_eval(
             preds=all_preds, labels=all_labels, global_step=cur_epoch
         )
@@ -374,7 +330,9 @@ def eval_epoch(val_loader, model, val_meter, cur_epoch, cfg, writer=None):
     val_meter.reset()
 
 
-def calculate_and_update_precise_bn(loader, model, num_iters=200, use_gpu=True):
+def calculate_and_update_precise_bn(
+    loader, model, num_iters=200, use_gpu=True, channels_last=False
+):
     """
     Update the stats in bn layers by calculate the precise stats.
     Args:
@@ -382,16 +340,19 @@ def calculate_and_update_precise_bn(loader, model, num_iters=200, use_gpu=True):
         model (model): model to update the bn stats.
         num_iters (int): number of iterations to compute and update the bn stats.
         use_gpu (bool): whether to use GPU or not.
+        channels_last (bool): whether to convert the inputs to the channels
+            last memory format.
     """
 
     def _gen_loader():
-        for inputs, *_ in loader:
-            if use_gpu:
-                if isinstance(inputs, (list,)):
-                    for i in range(len(inputs)):
-                        inputs[i] = inputs[i].cuda(non_blocking=True)
-                else:
-                    inputs = inputs.cuda(non_blocking=True)
+        # Only load the batches that are used, the prefetcher reads ahead.
+        data_iter = itertools.islice(loader, num_iters)
+        if use_gpu:
+            # Transfer the data to the current GPU device on a side stream.
+            data_iter = DataPrefetcher(data_iter)
+        for inputs, *_ in data_iter:
+            if channels_last:
+                inputs = [misc.to_channels_last(x) for x in inputs]
             yield inputs
 
     # Update the bn stats.
@@ -410,8 +371,8 @@ def build_trainer(cfg):
         optimizer (Optimizer): optimizer.
         train_loader (DataLoader): training data loader.
         val_loader (DataLoader): validatoin data loader.
-        precise_bn_loader (DataLoader): training data loader for computing
-            precise BN.
+        precise_bn_loader (DataLoader or None): training data loader for
+            computing precise BN, None if `BN.USE_PRECISE_STATS` is off.
         train_meter (TrainMeter): tool for measuring training stats.
         val_meter (ValMeter): tool for measuring validation stats.
     """
@@ -426,8 +387,10 @@ def build_trainer(cfg):
     # Create the video train and val loaders.
     train_loader = loader.construct_loader(cfg, "train")
     val_loader = loader.construct_loader(cfg, "val")
-    precise_bn_loader = loader.construct_loader(
-        cfg, "train", is_precise_bn=True
+    precise_bn_loader = (
+        loader.construct_loader(cfg, "train", is_precise_bn=True)
+        if cfg.BN.USE_PRECISE_STATS
+        else None
     )
     # Create meters.
     train_meter = TrainMeter(len(train_loader), cfg)
@@ -460,6 +423,12 @@ def train(cfg):
     # Setup logging format.
     logging.setup_logging(cfg.OUTPUT_DIR)
 
+    if cfg.TRAIN.CUDNN_BENCHMARK:
+        # Multigrid long cycles change the input shapes across epochs.
+        torch.backends.cudnn.benchmark = not cfg.MULTIGRID.LONG_CYCLE
+        torch.backends.cuda.matmul.allow_tf32 = True
+        torch.backends.cudnn.allow_tf32 = True
+
     # Init multigrid.
     multigrid = None
     if cfg.MULTIGRID.LONG_CYCLE or cfg.MULTIGRID.SHORT_CYCLE:
@@ -472,6 +441,11 @@ def train(cfg):
     logger.info("Train with config:")
     logger.info(pprint.pformat(cfg))
 
+    if cfg.SOLVER.USE_MIXED_PRECISION and cfg.SOLVER.AMP_DTYPE == "bf16":
+        assert hasattr(
+            torch, "autocast"
+        ), "SOLVER.AMP_DTYPE bf16 needs PyTorch 1.10"
+
     # Build the video model and print model statistics.
     model = build_model(cfg)
     if du.is_master_proc() and cfg.LOG_MODEL_INFO:
@@ -480,8 +454,8 @@ def train(cfg):
     # Construct the optimizer.
     optimizer = optim.construct_optimizer(model, cfg)
 
-    # Mixed Precision Training Scaler
-    if cfg.SOLVER.USE_MIXED_PRECISION:
+    # Mixed Precision Training Scaler, not needed with the fp32 range of bf16.
+    if cfg.SOLVER.USE_MIXED_PRECISION and cfg.SOLVER.AMP_DTYPE == "fp16":
         loss_scaler = torch.cuda.amp.GradScaler()
     else:
         loss_scaler = None
@@ -542,6 +516,19 @@ def train(cfg):
     else:
         loss_fun = losses.get_loss_func(cfg.MODEL.LOSS_FUNC)(reduction="mean")
 
+    # Compile the model for training and validation. Checkpointing and
+    # precise BN use the eager model, which shares its parameters, so that
+    # the state dict keys and the BN modules are unchanged.
+    train_model = model
+    if cfg.TRAIN.COMPILE:
+        if cfg.MULTIGRID.LONG_CYCLE:
+            logger.info("TRAIN.COMPILE is ignored with multigrid long cycles.")
+        else:
+            assert hasattr(torch, "compile"), "TRAIN.COMPILE needs PyTorch 2.0"
+            train_model = torch.compile(
+                model, mode=cfg.TRAIN.COMPILE_MODE, dynamic=False
+            )
+
     for cur_epoch in range(start_epoch, cfg.SOLVER.MAX_EPOCH):
         if cfg.MULTIGRID.LONG_CYCLE:
             cfg, changed = multigrid.update_long_cycle(cfg, cur_epoch)
@@ -566,13 +553,16 @@ def train(cfg):
                 cu.load_checkpoint(
                     last_checkpoint, model, cfg.NUM_GPUS > 1, optimizer
                 )
+                # Train the rebuilt model. It is never compiled, since
+                # TRAIN.COMPILE is ignored with long cycles.
+                train_model = model
 
         # Shuffle the dataset.
         loader.shuffle_dataset(train_loader, cur_epoch)
 
         # Train for one epoch.
         train_epoch(
-            train_loader, model, optimizer, train_meter, cur_epoch, cfg, writer, 
+            train_loader, train_model, optimizer, train_meter, cur_epoch, cfg, writer, 
             loss_scaler=loss_scaler, loss_fun=loss_fun, mixup_fn=mixup_fn)
 
         is_checkp_epoch = cu.is_checkpoint_epoch(
@@ -595,6 +585,7 @@ def train(cfg):
                 model,
                 min(cfg.BN.NUM_BATCHES_PRECISE, len(precise_bn_loader)),
                 cfg.NUM_GPUS > 0,
+                cfg.TRAIN.CHANNELS_LAST,
             )
         _ = misc.aggregate_sub_bn_stats(model)
 
@@ -604,7 +595,9 @@ def train(cfg):
                 loss_scaler=loss_scaler)
         # Evaluate the model on validation set.
         if is_eval_epoch:
-            eval_epoch(val_loader, model, val_meter, cur_epoch, cfg, writer)
+            eval_epoch(
+                val_loader, train_model, val_meter, cur_epoch, cfg, writer
+            )
 
     if writer is not None:
         writer.close()